@@ -1,24 +1,56 @@
+import gc
+import os
+
 from machine import I2C, Pin
-from utime import sleep, time
+from utime import sleep, ticks_diff, ticks_us, time
 
 from pico_i2c_lcd import I2cLcd
+from looptrace import EV_DELETE, EV_FRAME, EV_WRITE, digest
+
+# Shared by every Timer, so the table is built once at import time.
+# (singular name, plural name, seconds)
+INTERVALS = (
+    ('week', 'weeks', 604800),  # 60 * 60 * 24 * 7
+    ('day', 'days', 86400),     # 60 * 60 * 24
+    ('h', 'h', 3600),           # 60 * 60
+    ('m', 'm', 60),
+    ('s', 's', 1),
+)
 
 
 class Screen:
     """
     Class responsible for all display actions.
+
+    Text is rendered as a diff against what is already on the panel,
+    only the changed part of each row is sent over I2C.
     """
-    def __init__(self):
-        i2c = I2C(0, sda=Pin(0), scl=Pin(1), freq=400000)
-        I2C_ADDR = i2c.scan()[0]
-        self.lcd = I2cLcd(i2c, I2C_ADDR, 2, 16)
+    def __init__(self, i2c=None, addr=None, lines=2, columns=16):
+        if i2c is None:
+            i2c = I2C(0, sda=Pin(0), scl=Pin(1), freq=400000)
+        if addr is None:
+            addr = i2c.scan()[0]
+        self.lcd = I2cLcd(i2c, addr, lines, columns)
+        # when True, display() only stages the text and flush() writes it
+        self.deferred = False
+        # optional TraceRecorder, frames are recorded when set
+        self.trace = None
         self._cur_displayed = ''
+        blank = ' ' * self.lcd.num_columns
+        self._shown = [blank] * self.lcd.num_lines
+        self._target = [blank] * self.lcd.num_lines
+        self._row = 0
 
     def clear(self):
         """
         Clears LCD display.
         """
         self.lcd.clear()
+        blank = ' ' * self.lcd.num_columns
+        for row in range(self.lcd.num_lines):
+            self._shown[row] = blank
+            self._target[row] = blank
+        self._cur_displayed = ''
         
     def backlight(self):
         """Check backlight state.
@@ -44,11 +76,132 @@ class Screen:
         if not self.lcd.backlight and switch_light:
             self.lcd.backlight_on()
         if self._cur_displayed != text:
-            self.lcd.clear()
-            self.lcd.putstr(text)
+            self._layout(text)
             self._cur_displayed = text
-        
+            if self.trace is not None:
+                self.trace.record(EV_FRAME, digest(text))
+            if not self.deferred:
+                self.flush()
 
+    def _layout(self, text:str):
+        """Split text into padded panel rows, wrapping long lines like LcdApi.putstr.
+
+        Args:
+            text (str): Text to display, lines separated with '\n'.
+        """
+        columns = self.lcd.num_columns
+        lines = self.lcd.num_lines
+        row = 0
+        for line in text.split('\n'):
+            for col in range(0, max(len(line), 1), columns):
+                if row == lines:
+                    break
+                chunk = line[col:col+columns]
+                self._target[row] = chunk + ' ' * (columns - len(chunk))
+                row += 1
+        blank = ' ' * columns
+        while row < lines:
+            self._target[row] = blank
+            row += 1
+
+    def dirty(self) -> bool:
+        """Check if staged text still differs from the panel.
+
+        Returns:
+            (bool): Is there anything left to write?
+        """
+        return self._shown != self._target
+
+    def flush_row(self) -> int:
+        """Write changed part of the next dirty row.
+
+        Returns:
+            (int): Number of characters written, 0 when panel is up to date.
+        """
+        lines = self.lcd.num_lines
+        for _ in range(lines):
+            row = self._row
+            self._row = (row + 1) % lines
+            shown = self._shown[row]
+            target = self._target[row]
+            if shown == target:
+                continue
+            first = 0
+            while shown[first] == target[first]:
+                first += 1
+            last = len(target) - 1
+            while shown[last] == target[last]:
+                last -= 1
+            self.lcd.move_to(first, row)
+            # one byte per character like LcdApi.putchar, not UTF-8
+            self.lcd.hal_write_bytes(bytes(ord(char) & 0xff for char in target[first:last+1]))
+            self._shown[row] = target
+            return last + 1 - first
+        return 0
+
+    def flush(self):
+        """
+        Write all staged changes to the panel.
+        """
+        while self.flush_row():
+            pass
+
+
+class ScreenGroup:
+    """
+    Several LCD panels sharing one I2C bus.
+
+    Panels are deferred, display() only stages text and refresh() writes
+    the changes, interleaving panels row by row until the bus time budget
+    for this refresh is used. Whatever is left is written on the next refresh.
+    """
+    def __init__(self, i2c, panels, budget_us:int=4000):
+        """
+        Args:
+            i2c (I2C): Bus shared by all panels.
+            panels (tuple): (i2c_addr, lines, columns) for every panel, first one is the main panel.
+            budget_us (int, optional): Max bus time spent in single refresh. Defaults to 4000.
+        """
+        self.screens = []
+        for addr, lines, columns in panels:
+            screen = Screen(i2c, addr, lines, columns)
+            screen.deferred = True
+            self.screens.append(screen)
+        self.budget_us = budget_us
+
+    def __getitem__(self, index:int) -> Screen:
+        return self.screens[index]
+
+    def __len__(self):
+        return len(self.screens)
+
+    def display(self, index:int, text:str, switch_light=True):
+        """Stage text for one of the panels.
+
+        Args:
+            index (int): Panel number.
+            text (str): Text to display.
+            switch_light (bool, optional): Turn on backlight. Defaults to True.
+        """
+        self.screens[index].display(text, switch_light)
+
+    def refresh(self) -> bool:
+        """Write staged changes within bus time budget.
+
+        Returns:
+            (bool): True when every panel is up to date.
+        """
+        start = ticks_us()
+        pending = True
+        while pending:
+            pending = False
+            for screen in self.screens:
+                if screen.flush_row():
+                    pending = True
+                if ticks_diff(ticks_us(), start) >= self.budget_us:
+                    return not any(screen.dirty() for screen in self.screens)
+        return True
+        
 
 class Storage:
     """
@@ -56,6 +209,10 @@ class Storage:
     """
     def __init__(self, path="storage.csv"):
         self.path = path
+        # optional TraceRecorder, writes are recorded when set
+        self.trace = None
+        # optional HistoryIndex, kept up to date with every change
+        self.index = None
         
     def clear(self):
         """
@@ -64,6 +221,8 @@ class Storage:
         
         with open(self.path, "w") as f:
             pass
+        if self.index is not None:
+            self.index.rebuild(())
 
     def add_row(self, content:list, delimiter:str):
         """
@@ -76,7 +235,13 @@ class Storage:
         content = [str(elem) for elem in content]
         output = delimiter.join(content)
         with open(self.path, "a") as f:
+            f.seek(0, 2)
+            offset = f.tell()
             f.write(output+"\n")
+        if self.index is not None:
+            self.index.add(offset, output+"\n")
+        if self.trace is not None:
+            self.trace.record(EV_WRITE, digest(output))
             
     def size(self):
         """
@@ -120,6 +285,224 @@ class Storage:
         with open(self.path, "w") as f:
             for row in output:
                 f.write(row)
+        if self.index is not None:
+            if row_num == len(lines)-1:
+                offset = 0
+                for row in output:
+                    offset += len(row)
+                if not self.index.remove(offset, lines[row_num], output[-1] if output else None):
+                    self.index.rebuild(output)
+            else:
+                # offsets of following rows moved
+                self.index.rebuild(output)
+        if self.trace is not None:
+            self.trace.record(EV_DELETE, row_num)
+
+
+def _day_number(day:str) -> int:
+    """Days since 1970-01-01, there is no datetime on the board.
+
+    Args:
+        day (str): Day as YYYY-MM-DD.
+
+    Returns:
+        (int): Day number.
+    """
+    year, month, day = [int(elem) for elem in day.split("-")]
+    if month <= 2:
+        year -= 1
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+class HistoryIndex:
+    """
+    Calendar index of Storage file, maps every day to its first and last
+    row offsets and per task totals, so history doesn't need a file scan.
+
+    Storage rows are: task;seconds;YYYY-MM-DD, rows without day are skipped.
+
+    Index file is saved by add() when number of days changed and at most
+    every save_interval seconds otherwise. An index saved before the latest rows
+    is rebuilt from storage by load(), its size won't match.
+    """
+    def __init__(self, path="history.idx", delimiter=";", save_interval:int=300):
+        self.path = path
+        self.delimiter = delimiter
+        # day -> [first offset, last offset, {task: seconds}]
+        self.days = {}
+        # storage file size covered by index
+        self.size = 0
+        self.save_interval = save_interval
+        self.saved_at = time()
+        # number of days in saved file
+        self.saved_days = 0
+
+    def load(self, storage_path:str):
+        """Load index file, rebuild it from storage when missing or outdated.
+
+        Args:
+            storage_path (str): Storage file the index belongs to.
+        """
+        try:
+            storage_size = os.stat(storage_path)[6]
+        except OSError:
+            storage_size = 0
+        self.days = {}
+        self.size = 0
+        try:
+            with open(self.path, "r") as f:
+                self.size = int(f.readline())
+                for line in f:
+                    day, first, last, *tasks = line.rstrip("\n").split(self.delimiter)
+                    totals = {}
+                    for elem in tasks:
+                        task, seconds = elem.split("=")
+                        totals[task] = int(seconds)
+                    self.days[day] = [int(first), int(last), totals]
+        except (OSError, ValueError):
+            self.size = -1
+        if self.size == storage_size:
+            self.saved_days = len(self.days)
+            return
+        if storage_size:
+            with open(storage_path, "r") as f:
+                self.rebuild(f)
+        else:
+            self.days = {}
+            self.size = 0
+
+    def save(self):
+        """
+        Write index to file.
+        """
+        self.saved_at = time()
+        self.saved_days = len(self.days)
+        with open(self.path, "w") as f:
+            f.write(f"{self.size}\n")
+            for day in self.day_list():
+                first, last, totals = self.days[day]
+                tasks = [f"{task}={seconds}" for task, seconds in totals.items()]
+                f.write(self.delimiter.join([day, str(first), str(last)] + tasks) + "\n")
+
+    def rebuild(self, rows):
+        """Rebuild index from raw storage rows.
+
+        Args:
+            rows (iterable): Storage rows, with line endings.
+        """
+        self.days = {}
+        self.size = 0
+        for row in rows:
+            self._add(self.size, row)
+        self.save()
+
+    def _parse(self, row:str):
+        fields = row.rstrip("\n").split(self.delimiter)
+        if len(fields) < 3:
+            return None
+        return fields[2], fields[0], int(fields[1])
+
+    def _add(self, offset:int, row:str):
+        self.size = offset + len(row)
+        parsed = self._parse(row)
+        if parsed is None:
+            return
+        day, task, seconds = parsed
+        entry = self.days.get(day)
+        if entry is None:
+            entry = self.days[day] = [offset, offset, {}]
+        entry[1] = offset
+        entry[2][task] = entry[2].get(task, 0) + seconds
+
+    def add(self, offset:int, row:str):
+        """Add row appended to storage.
+
+        Args:
+            offset (int): Offset of the row in storage file.
+            row (str): Appended row.
+        """
+        self._add(offset, row)
+        self._changed()
+
+    def remove(self, offset:int, row:str, prev_row:str=None):
+        """Remove last row of storage.
+
+        Args:
+            offset (int): Offset of removed row.
+            row (str): Removed row.
+            prev_row (str, optional): Row before removed one, None when storage is empty now.
+
+        Returns:
+            (bool): False when index can't be updated in place and has to be rebuilt,
+                e.g. previous row is from another day after RTC was reset.
+        """
+        parsed = self._parse(row)
+        if parsed is not None:
+            day, task, seconds = parsed
+            if day not in self.days:
+                return False
+            first, last, totals = self.days[day]
+            if first == offset:
+                del self.days[day]
+            else:
+                prev = None if prev_row is None else self._parse(prev_row)
+                if prev is None or prev[0] != day:
+                    return False
+                self.days[day][1] = offset - len(prev_row)
+                totals[task] -= seconds
+                if not totals[task]:
+                    del totals[task]
+        # not saved, the running row is deleted and added back every refresh
+        self.size = offset
+        return True
+
+    def _changed(self):
+        if len(self.days) != self.saved_days or time() - self.saved_at >= self.save_interval:
+            self.save()
+
+    def day_list(self) -> list:
+        """Indexed days.
+
+        Returns:
+            list: Days, oldest first.
+        """
+        return sorted(self.days)
+
+    def week_list(self) -> list:
+        """Indexed days grouped by week, Monday to Sunday.
+
+        Returns:
+            list: Lists of days, oldest week first.
+        """
+        weeks = []
+        prev = None
+        for day in self.day_list():
+            number = _day_number(day)
+            week = number - (number + 3) % 7  # 1970-01-01 was Thursday
+            if week != prev:
+                weeks.append([])
+                prev = week
+            weeks[-1].append(day)
+        return weeks
+
+    def totals(self, days:list) -> dict:
+        """Per task totals summed over several days, e.g. one week.
+
+        Args:
+            days (list): Days as YYYY-MM-DD.
+
+        Returns:
+            dict: {task: seconds}
+        """
+        summed = {}
+        for day in days:
+            for task, seconds in self.days[day][2].items():
+                summed[task] = summed.get(task, 0) + seconds
+        return summed
 
 
 class Button:
@@ -152,14 +535,25 @@ class Board:
     """
     Board state and all of the elements of it.
     """
-    def __init__(self):
+    def __init__(self, panels=None):
+        """
+        Args:
+            panels (tuple, optional): (i2c_addr, lines, columns) for every panel, see ScreenGroup.
+                Defaults to None, single panel found with i2c.scan().
+        """
         self.buttons = (
             Button(1, 19),
             Button(2, 18),
             Button(3, 17),
             Button(4, 16),
             )
-        self.screen = Screen()
+        if panels is None:
+            self.panels = None
+            self.screen = Screen()
+        else:
+            i2c = I2C(0, sda=Pin(0), scl=Pin(1), freq=400000)
+            self.panels = ScreenGroup(i2c, panels)
+            self.screen = self.panels[0]
         self.last_update = time()
         self.active_screen = 0
         
@@ -171,20 +565,17 @@ class Board:
         """
         self.active_screen = screen_number
         self.last_update = time()
+
+    def refresh(self):
+        """
+        Write pending panel changes, used when board drives several panels.
+        """
+        if self.panels is not None:
+            self.panels.refresh()
         
 class Timer:
     def __init__(self):
-        self.active = False
-        self._elapsed_time = 0
-        self.prev_refresh = -1
-        self.start_time = time()
-        self.intervals = (
-            ('weeks', 604800),  # 60 * 60 * 24 * 7
-            ('days', 86400),    # 60 * 60 * 24
-            ('h', 3600),    # 60 * 60
-            ('m', 60),
-            ('s', 1),
-        )
+        self.restart()
 
     def __repr__(self):
         return f"{self.display_time(self._elapsed_time)}"
@@ -201,13 +592,11 @@ class Timer:
         """
         result = []
 
-        for name, count in self.intervals:
+        for single, plural, count in INTERVALS:
             value = seconds // count
             if value:
                 seconds -= value * count
-                if value == 1 and name != 's':
-                    name = name.rstrip('s')
-                result.append(f"{value}{name}")
+                result.append(f"{value}{single if value == 1 else plural}")
         # removing seconds if task takes more than 60 seconds
         if len(result) > 1:
             result = result[:len(result)-1]
@@ -227,7 +616,10 @@ class Timer:
         """
         Restart Timer
         """
-        self.__init__()
+        self.active = False
+        self._elapsed_time = 0
+        self.prev_refresh = -1
+        self.start_time = time()
 
     def refresh(self, refresh_sec: int):
         """
@@ -259,13 +651,18 @@ class Task:
         self.category = category
         self.name = name        
         self.active = False
+        self.tim = None
 
     def __repr__(self):
         return f"{self.category}:{self.name}"
 
     def start(self):
         self.active = True
-        self.tim = Timer()
+        # reuse the Timer between runs instead of allocating a new one
+        if self.tim is None:
+            self.tim = Timer()
+        else:
+            self.tim.restart()
 
     def status(self):
         return self.tim.elapsed()
@@ -311,3 +708,39 @@ class Tasks:
             self.current_index -= 1
         self.current_task = self.list[self.current_index]
         return self.current_task
+
+
+class HeapMonitor:
+    """
+    Heap usage report, used to measure memory footprint of the main loop.
+
+    Every few iterations a single loop() call is measured right after
+    gc.collect(), the heap growth over it is what that iteration allocated.
+    Automatic GC stays enabled.
+    """
+    def __init__(self, every:int=100):
+        """
+        Args:
+            every (int, optional): Measure one of that many iterations. Defaults to 100.
+        """
+        gc.collect()
+        self.boot = gc.mem_alloc()
+        self.every = every
+        self.iterations = 0
+        print(f"heap: {self.boot}B used after boot, {gc.mem_free()}B free")
+
+    def run(self, loop):
+        """Run single loop iteration, measure it when due.
+
+        Args:
+            loop (function): Main loop iteration.
+        """
+        self.iterations += 1
+        if self.iterations % self.every:
+            loop()
+            return
+        gc.collect()
+        used = gc.mem_alloc()
+        loop()
+        allocated = gc.mem_alloc() - used
+        print(f"heap: {used}B used, {allocated}B allocated by loop iteration")
@@ -2,50 +2,53 @@
 
 import time
 
-class LcdApi:
-    """Implements the API for talking with HD44780 compatible character LCDs.
-    This class only knows what commands to send to the LCD, and not how to get
-    them to the LCD.
+from micropython import const
 
-    It is expected that a derived class will implement the hal_xxx functions.
-    """
+# The following constant names were lifted from the avrlib lcd.h
+# header file, however, I changed the definitions from bit numbers
+# to bit masks.
+#
+# HD44780 LCD controller command set
 
-    # The following constant names were lifted from the avrlib lcd.h
-    # header file, however, I changed the definitions from bit numbers
-    # to bit masks.
-    #
-    # HD44780 LCD controller command set
+_LCD_CLR = const(0x01)               # DB0: clear display
+_LCD_HOME = const(0x02)              # DB1: return to home position
 
-    LCD_CLR = 0x01              # DB0: clear display
-    LCD_HOME = 0x02             # DB1: return to home position
+_LCD_ENTRY_MODE = const(0x04)        # DB2: set entry mode
+_LCD_ENTRY_INC = const(0x02)         # --DB1: increment
+_LCD_ENTRY_SHIFT = const(0x01)       # --DB0: shift
 
-    LCD_ENTRY_MODE = 0x04       # DB2: set entry mode
-    LCD_ENTRY_INC = 0x02        # --DB1: increment
-    LCD_ENTRY_SHIFT = 0x01      # --DB0: shift
+_LCD_ON_CTRL = const(0x08)           # DB3: turn lcd/cursor on
+_LCD_ON_DISPLAY = const(0x04)        # --DB2: turn display on
+_LCD_ON_CURSOR = const(0x02)         # --DB1: turn cursor on
+_LCD_ON_BLINK = const(0x01)          # --DB0: blinking cursor
 
-    LCD_ON_CTRL = 0x08          # DB3: turn lcd/cursor on
-    LCD_ON_DISPLAY = 0x04       # --DB2: turn display on
-    LCD_ON_CURSOR = 0x02        # --DB1: turn cursor on
-    LCD_ON_BLINK = 0x01         # --DB0: blinking cursor
+_LCD_MOVE = const(0x10)              # DB4: move cursor/display
+_LCD_MOVE_DISP = const(0x08)         # --DB3: move display (0-> move cursor)
+_LCD_MOVE_RIGHT = const(0x04)        # --DB2: move right (0-> left)
 
-    LCD_MOVE = 0x10             # DB4: move cursor/display
-    LCD_MOVE_DISP = 0x08        # --DB3: move display (0-> move cursor)
-    LCD_MOVE_RIGHT = 0x04       # --DB2: move right (0-> left)
+_LCD_FUNCTION = const(0x20)          # DB5: function set
+_LCD_FUNCTION_8BIT = const(0x10)     # --DB4: set 8BIT mode (0->4BIT mode)
+_LCD_FUNCTION_2LINES = const(0x08)   # --DB3: two lines (0->one line)
+_LCD_FUNCTION_10DOTS = const(0x04)   # --DB2: 5x10 font (0->5x7 font)
+_LCD_FUNCTION_RESET = const(0x30)    # See "Initializing by Instruction" section
 
-    LCD_FUNCTION = 0x20         # DB5: function set
-    LCD_FUNCTION_8BIT = 0x10    # --DB4: set 8BIT mode (0->4BIT mode)
-    LCD_FUNCTION_2LINES = 0x08  # --DB3: two lines (0->one line)
-    LCD_FUNCTION_10DOTS = 0x04  # --DB2: 5x10 font (0->5x7 font)
-    LCD_FUNCTION_RESET = 0x30   # See "Initializing by Instruction" section
+_LCD_CGRAM = const(0x40)             # DB6: set CG RAM address
+_LCD_DDRAM = const(0x80)             # DB7: set DD RAM address
 
-    LCD_CGRAM = 0x40            # DB6: set CG RAM address
-    LCD_DDRAM = 0x80            # DB7: set DD RAM address
+_LCD_RS_CMD = const(0)
+_LCD_RS_DATA = const(1)
 
-    LCD_RS_CMD = 0
-    LCD_RS_DATA = 1
+_LCD_RW_WRITE = const(0)
+_LCD_RW_READ = const(1)
 
-    LCD_RW_WRITE = 0
-    LCD_RW_READ = 1
+
+class LcdApi:
+    """Implements the API for talking with HD44780 compatible character LCDs.
+    This class only knows what commands to send to the LCD, and not how to get
+    them to the LCD.
+
+    It is expected that a derived class will implement the hal_xxx functions.
+    """
 
     def __init__(self, num_lines, num_columns):
         self.num_lines = num_lines
@@ -61,7 +64,7 @@ class LcdApi:
         self.display_off()
         self.backlight_on()
         self.clear()
-        self.hal_write_command(self.LCD_ENTRY_MODE | self.LCD_ENTRY_INC)
+        self.hal_write_command(_LCD_ENTRY_MODE | _LCD_ENTRY_INC)
         self.hide_cursor()
         self.display_on()
 
@@ -69,37 +72,37 @@ class LcdApi:
         """Clears the LCD display and moves the cursor to the top left
         corner.
         """
-        self.hal_write_command(self.LCD_CLR)
-        self.hal_write_command(self.LCD_HOME)
+        self.hal_write_command(_LCD_CLR)
+        self.hal_write_command(_LCD_HOME)
         self.cursor_x = 0
         self.cursor_y = 0
 
     def show_cursor(self):
         """Causes the cursor to be made visible."""
-        self.hal_write_command(self.LCD_ON_CTRL | self.LCD_ON_DISPLAY |
-                               self.LCD_ON_CURSOR)
+        self.hal_write_command(_LCD_ON_CTRL | _LCD_ON_DISPLAY |
+                               _LCD_ON_CURSOR)
 
     def hide_cursor(self):
         """Causes the cursor to be hidden."""
-        self.hal_write_command(self.LCD_ON_CTRL | self.LCD_ON_DISPLAY)
+        self.hal_write_command(_LCD_ON_CTRL | _LCD_ON_DISPLAY)
 
     def blink_cursor_on(self):
         """Turns on the cursor, and makes it blink."""
-        self.hal_write_command(self.LCD_ON_CTRL | self.LCD_ON_DISPLAY |
-                               self.LCD_ON_CURSOR | self.LCD_ON_BLINK)
+        self.hal_write_command(_LCD_ON_CTRL | _LCD_ON_DISPLAY |
+                               _LCD_ON_CURSOR | _LCD_ON_BLINK)
 
     def blink_cursor_off(self):
         """Turns on the cursor, and makes it no blink (i.e. be solid)."""
-        self.hal_write_command(self.LCD_ON_CTRL | self.LCD_ON_DISPLAY |
-                               self.LCD_ON_CURSOR)
+        self.hal_write_command(_LCD_ON_CTRL | _LCD_ON_DISPLAY |
+                               _LCD_ON_CURSOR)
 
     def display_on(self):
         """Turns on (i.e. unblanks) the LCD."""
-        self.hal_write_command(self.LCD_ON_CTRL | self.LCD_ON_DISPLAY)
+        self.hal_write_command(_LCD_ON_CTRL | _LCD_ON_DISPLAY)
 
     def display_off(self):
         """Turns off (i.e. blanks) the LCD."""
-        self.hal_write_command(self.LCD_ON_CTRL)
+        self.hal_write_command(_LCD_ON_CTRL)
 
     def backlight_on(self):
         """Turns the backlight on.
@@ -130,7 +133,7 @@ class LcdApi:
             addr += 0x40    # Lines 1 & 3 add 0x40
         if cursor_y & 2:    # Lines 2 & 3 add number of columns
             addr += self.num_columns
-        self.hal_write_command(self.LCD_DDRAM | addr)
+        self.hal_write_command(_LCD_DDRAM | addr)
 
     def putchar(self, char):
         """Writes the indicated character to the LCD at the current cursor
@@ -166,7 +169,7 @@ class LcdApi:
         as chr(0) through chr(7).
         """
         location &= 0x7
-        self.hal_write_command(self.LCD_CGRAM | (location << 3))
+        self.hal_write_command(_LCD_CGRAM | (location << 3))
         self.hal_sleep_us(40)
         for i in range(8):
             self.hal_write_data(charmap[i])
@@ -203,6 +206,16 @@ class LcdApi:
         """
         raise NotImplementedError
 
+    def hal_write_bytes(self, data):
+        """Write a run of data bytes to the LCD, starting at the current
+        DDRAM address.
+
+        A derived HAL class can override this to send the whole run in
+        one bus transaction.
+        """
+        for byte in data:
+            self.hal_write_data(byte)
+
     # This is a default implementation of hal_sleep_us which is suitable
     # for most micropython implementations. For platforms which don't
     # support `time.sleep_us()` they should provide their own implementation
@@ -0,0 +1,116 @@
+"""Compact binary trace of the main loop, kept in a ring buffer in RAM."""
+
+import struct
+
+from micropython import const
+from utime import ticks_ms
+
+# record kinds
+EV_BOOT = const(0)      # value: time() at boot
+EV_TICK = const(1)      # value: time(), recorded when the second changes
+EV_BUTTONS = const(2)   # value: mask of buttons active in one loop iteration
+EV_FRAME = const(3)     # value: digest of text sent to the display
+EV_WRITE = const(4)     # value: digest of row appended to storage
+EV_DELETE = const(5)    # value: number of deleted storage row
+
+# set in EV_BUTTONS value when the buttons were read in the same loop
+# iteration as the EV_TICK recorded just before
+TICKED = const(0x100)
+
+# kind, ticks_ms, value
+RECORD = '<BII'
+RECORD_SIZE = struct.calcsize(RECORD)
+
+
+def digest(text:str) -> int:
+    """32 bit FNV-1a hash, same result on device and host.
+
+    Args:
+        text (str): Text to hash.
+
+    Returns:
+        (int): Hash of text.
+    """
+    h = 0x811c9dc5
+    for byte in text.encode():
+        h = ((h ^ byte) * 0x01000193) & 0xffffffff
+    return h
+
+
+def load(path:str="trace.bin"):
+    """Read trace records from file.
+
+    Args:
+        path (str, optional): Trace file. Defaults to "trace.bin".
+
+    Yields:
+        (tuple): kind, ticks_ms, value
+    """
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(RECORD_SIZE)
+            if len(chunk) < RECORD_SIZE:
+                return
+            yield struct.unpack(RECORD, chunk)
+
+
+class TraceRecorder:
+    """
+    Ring buffer of loop events, oldest records are overwritten when full.
+    """
+    def __init__(self, capacity:int=512):
+        self.buf = bytearray(capacity * RECORD_SIZE)
+        self.capacity = capacity
+        self.index = 0
+        self.count = 0
+        self.last_tick = -1
+
+    def record(self, kind:int, value:int=0):
+        """Add record to the ring buffer.
+
+        Args:
+            kind (int): One of EV_xxx.
+            value (int, optional): Event data. Defaults to 0.
+        """
+        struct.pack_into(RECORD, self.buf, self.index * RECORD_SIZE, kind, ticks_ms(), value)
+        self.index = (self.index + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def tick(self, seconds:int) -> bool:
+        """Record timer tick, only when the second changed.
+
+        Args:
+            seconds (int): Current time().
+
+        Returns:
+            (bool): Was the tick recorded?
+        """
+        if seconds != self.last_tick:
+            self.last_tick = seconds
+            self.record(EV_TICK, seconds)
+            return True
+        return False
+
+    def records(self):
+        """Iterate over buffered records, oldest first.
+
+        Yields:
+            (tuple): kind, ticks_ms, value
+        """
+        first = (self.index - self.count) % self.capacity
+        for i in range(self.count):
+            yield struct.unpack_from(RECORD, self.buf, ((first + i) % self.capacity) * RECORD_SIZE)
+
+    def dump(self, path:str="trace.bin"):
+        """Spill buffered records to flash and empty the buffer.
+
+        Args:
+            path (str, optional): Trace file, records are appended. Defaults to "trace.bin".
+        """
+        first = (self.index - self.count) % self.capacity
+        with open(path, "ab") as f:
+            for i in range(self.count):
+                pos = ((first + i) % self.capacity) * RECORD_SIZE
+                f.write(self.buf[pos:pos+RECORD_SIZE])
+        self.count = 0
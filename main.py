@@ -1,8 +1,14 @@
-from time import localtime, time
+from utime import localtime, time
 
-from classes import Board, Storage, Tasks, Timer
+from classes import Board, HeapMonitor, HistoryIndex, Storage, Tasks, Timer
+from looptrace import EV_BOOT, EV_BUTTONS, TICKED, TraceRecorder
 
-BOARD = Board()
+# (i2c_addr, lines, columns) of every LCD panel, first one is the main panel,
+# second one shows today's stats, e.g. ((0x27, 2, 16), (0x26, 4, 20)).
+# None uses the first panel found on the bus.
+PANELS = None
+
+BOARD = Board(PANELS)
 BTN = BOARD.buttons
 SCREEN = BOARD.screen
 
@@ -20,12 +26,32 @@ TASKS = Tasks(
 )
 
 STORAGE = Storage()
+# loaded by setup(), so paths can be changed after import
+HISTORY = HistoryIndex()
 tim = Timer()
 refresh_frequency = 5
 tim_elapsed, tim_refresh = 0,0
 
 screen_timeout = 20
 
+# history screens, button 1 switches clock -> days -> weeks,
+# pages are browsed with buttons 2 and 3
+HISTORY_SCREEN = 3
+WEEK_SCREEN = 4
+history_page = -1
+
+# print heap usage after boot and allocation of every 100th loop iteration
+mem_report = False
+HEAP = HeapMonitor() if mem_report else None
+
+# record loop events into ring buffer, spilled to trace.bin on Ctrl-C
+# or with TRACE.dump() from REPL, replay it on host with replay.py
+trace_enabled = False
+TRACE = TraceRecorder() if trace_enabled else None
+SCREEN.trace = STORAGE.trace = TRACE
+if TRACE is not None:
+    TRACE.record(EV_BOOT, time())
+
 def time_now() -> str:
     """
     Format time.localtime.
@@ -40,6 +66,78 @@ def time_now() -> str:
         t.append('0'+str(elem) if elem < 10 else str(elem))
     return f"   {t[2]}.{t[1]}.{t[0]}\n     {t[3]}:{t[4]}"
 
+def today() -> str:
+    """
+    Current day, as stored in storage rows.
+
+    Returns:
+        str: YYYY-MM-DD
+    """
+    lt = localtime()
+    return "%04d-%02d-%02d" % (lt[0], lt[1], lt[2])
+
+def history_pages() -> list:
+    """Pages of active history screen.
+
+    Returns:
+        list: Lists of days, single day per page or whole week.
+    """
+    if BOARD.active_screen == WEEK_SCREEN:
+        return HISTORY.week_list()
+    return [[day] for day in HISTORY.day_list()]
+
+def display_history() -> str:
+    """Total and most tracked task of browsed day or week.
+    Week is labeled with its first tracked day.
+
+    Returns:
+        str: formated text
+    """
+    pages = history_pages()
+    if not pages:
+        return "NO DATA!"
+    columns = SCREEN.lcd.num_columns
+    days = pages[history_page]
+    year, month, day = days[0].split("-")
+    label = "w" if BOARD.active_screen == WEEK_SCREEN else ""
+    totals = HISTORY.totals(days)
+    task = max(totals, key=totals.get)
+    total = f"{label}{day}.{month} {tim.display_time(sum(totals.values()))}"
+    return f"{total[:columns]}\n{task_line(task, totals[task], columns)}"
+
+def task_line(task:str, seconds:int, columns:int) -> str:
+    """Task name and time fitted into single panel row.
+
+    Returns:
+        str: formated text
+    """
+    task_time = tim.display_time(seconds)
+    # task name without category, cut to what's left of the row
+    name = task.split(":")[-1][:columns-len(task_time)-1]
+    return f"{name} {task_time}"
+
+def display_stats() -> str:
+    """Today's total and most tracked tasks, for the stats panel.
+
+    Returns:
+        str: formated text
+    """
+    panel = BOARD.panels[1].lcd
+    day = today()
+    totals = HISTORY.totals([day]) if day in HISTORY.days else {}
+    total = tim.display_time(sum(totals.values())) or "0s"
+    lines = [f"today {total}"[:panel.num_columns]]
+    for task in sorted(totals, key=totals.get, reverse=True)[:panel.num_lines-1]:
+        lines.append(task_line(task, totals[task], panel.num_columns))
+    return "\n".join(lines)
+
+def update_stats():
+    """
+    Refresh stats panel, when board has one.
+    """
+    if BOARD.panels is not None and len(BOARD.panels) > 1:
+        BOARD.panels.display(1, display_stats(), False)
+
 def display_task_time() -> str:
     """Nicely formatted task & time.
 
@@ -48,7 +146,7 @@ def display_task_time() -> str:
     """
     # TODO: simplify that spaghetti
     try:
-        task, t = STORAGE.get_row().split(";")
+        task, t = STORAGE.get_row().split(";")[:2]
         if task == str(TASKS.current_task):
             if tim.active:
                 return str(task)+"\n"+str(tim.display_time(int(t)))
@@ -67,8 +165,12 @@ def refresh_func(refresh_frequency):
     tim_refresh = tim_elapsed % refresh_frequency == 0 and tim_elapsed != tim.prev_refresh
     return tim_elapsed, tim_refresh
 
-# MAIN LOOP
-while True:
+def loop():
+    """
+    Single iteration of the main loop.
+    """
+    global tim_elapsed, tim_refresh, history_page
+    ticked = TRACE is not None and TRACE.tick(time())
     if tim.active:
         tim_elapsed, tim_refresh = refresh_func(refresh_frequency)
     # GENERAL LOGIC
@@ -78,23 +180,45 @@ while True:
             SCREEN.toggle()
     
     # BUTTON ACTION
-    if BTN[0].active():
-        BOARD.update(0)
-        SCREEN.display(time_now())
-    if BTN[1].active():
-        if BOARD.active_screen != 0:
-            s = TASKS.prev_task()
-            tim.restart()
-        BOARD.update(1)
-        SCREEN.display(display_task_time())
-    if BTN[2].active():
-        if BOARD.active_screen != 0:
-            s = TASKS.next_task()
-            tim.restart()
-        BOARD.update(2)
-        SCREEN.display(display_task_time())
-    if BTN[3].active():
-        if BOARD.active_screen != 0:
+    pressed = 0
+    for i in range(len(BTN)):
+        if BTN[i].active():
+            pressed |= 1 << i
+    if pressed and TRACE is not None:
+        TRACE.record(EV_BUTTONS, pressed | TICKED if ticked else pressed)
+
+    if pressed & 1:
+        if BOARD.active_screen in (0, HISTORY_SCREEN):
+            history_page = -1
+            BOARD.update(HISTORY_SCREEN if BOARD.active_screen == 0 else WEEK_SCREEN)
+            SCREEN.display(display_history())
+        else:
+            BOARD.update(0)
+            SCREEN.display(time_now())
+    if pressed & 2:
+        if BOARD.active_screen in (HISTORY_SCREEN, WEEK_SCREEN):
+            history_page = max(history_page-1, -len(history_pages()))
+            BOARD.update(BOARD.active_screen)
+            SCREEN.display(display_history())
+        else:
+            if BOARD.active_screen != 0:
+                s = TASKS.prev_task()
+                tim.restart()
+            BOARD.update(1)
+            SCREEN.display(display_task_time())
+    if pressed & 4:
+        if BOARD.active_screen in (HISTORY_SCREEN, WEEK_SCREEN):
+            history_page = min(history_page+1, -1)
+            BOARD.update(BOARD.active_screen)
+            SCREEN.display(display_history())
+        else:
+            if BOARD.active_screen != 0:
+                s = TASKS.next_task()
+                tim.restart()
+            BOARD.update(2)
+            SCREEN.display(display_task_time())
+    if pressed & 8:
+        if BOARD.active_screen not in (0, HISTORY_SCREEN, WEEK_SCREEN):
             tim.toggle()
             if tim.active is False:
                 tim_elapsed, tim_refresh = refresh_func(refresh_frequency)
@@ -114,10 +238,44 @@ while True:
         tim.refresh(tim_elapsed)
     
     if tim_refresh and tim_elapsed >= refresh_frequency and tim.active and tim_elapsed >= 5:
-        last_row = STORAGE.get_row().split(';')
+        last_row = STORAGE.get_row().rstrip("\n").split(';')
+        day = today()
         if last_row[0] != str(TASKS.current_task):
-            STORAGE.add_row([TASKS.current_task, tim_elapsed], ";")
-        elif last_row[0] == str(TASKS.current_task):
+            STORAGE.add_row([TASKS.current_task, tim_elapsed, day], ";")
+        elif last_row[2:] != [day]:
+            # task runs past midnight, time from now on goes to the new day
+            STORAGE.add_row([TASKS.current_task, refresh_frequency, day], ";")
+        else:
             STORAGE.del_row()
-            STORAGE.add_row([TASKS.current_task, int(last_row[1])+refresh_frequency], ";")
+            STORAGE.add_row([TASKS.current_task, int(last_row[1])+refresh_frequency, day], ";")
         tim.refresh(tim_elapsed)
+        update_stats()
+
+    BOARD.refresh()
+
+
+def setup():
+    """
+    Load history index and attach it to storage, called once before main loop.
+    """
+    HISTORY.load(STORAGE.path)
+    STORAGE.index = HISTORY
+    update_stats()
+
+
+def run():
+    setup()
+    try:
+        while True:
+            if HEAP is None:
+                loop()
+            else:
+                HEAP.run(loop)
+    except KeyboardInterrupt:
+        if TRACE is not None:
+            TRACE.dump()
+        raise
+
+
+if __name__ == "__main__":
+    run()
@@ -1,16 +1,22 @@
 import gc
 
 import utime
+from micropython import const
 
 from lcd_api import LcdApi
 
+# HD44780 commands used during initialization, see lcd_api.py
+_LCD_FUNCTION = const(0x20)
+_LCD_FUNCTION_2LINES = const(0x08)
+_LCD_FUNCTION_RESET = const(0x30)
+
 # PCF8574 pin definitions
-MASK_RS = 0x01       # P0
-MASK_RW = 0x02       # P1
-MASK_E  = 0x04       # P2
+_MASK_RS = const(0x01)       # P0
+_MASK_RW = const(0x02)       # P1
+_MASK_E  = const(0x04)       # P2
 
-SHIFT_BACKLIGHT = 3  # P3
-SHIFT_DATA      = 4  # P4-P7
+_SHIFT_BACKLIGHT = const(3)  # P3
+_SHIFT_DATA      = const(4)  # P4-P7
 
 class I2cLcd(LcdApi):
     
@@ -19,68 +25,89 @@ class I2cLcd(LcdApi):
     def __init__(self, i2c, i2c_addr, num_lines, num_columns):
         self.i2c = i2c
         self.i2c_addr = i2c_addr
-        self.i2c.writeto(self.i2c_addr, bytes([0]))
+        # Single byte buffer reused for every bus write, so writes don't
+        # allocate a new bytes object per nibble.
+        self._buf = bytearray(1)
+        self._write_byte(0)
         utime.sleep_ms(20)   # Allow LCD time to powerup
         # Send reset 3 times
-        self.hal_write_init_nibble(self.LCD_FUNCTION_RESET)
+        self.hal_write_init_nibble(_LCD_FUNCTION_RESET)
         utime.sleep_ms(5)    # Need to delay at least 4.1 msec
-        self.hal_write_init_nibble(self.LCD_FUNCTION_RESET)
+        self.hal_write_init_nibble(_LCD_FUNCTION_RESET)
         utime.sleep_ms(1)
-        self.hal_write_init_nibble(self.LCD_FUNCTION_RESET)
+        self.hal_write_init_nibble(_LCD_FUNCTION_RESET)
         utime.sleep_ms(1)
         # Put LCD into 4-bit mode
-        self.hal_write_init_nibble(self.LCD_FUNCTION)
+        self.hal_write_init_nibble(_LCD_FUNCTION)
         utime.sleep_ms(1)
         LcdApi.__init__(self, num_lines, num_columns)
-        cmd = self.LCD_FUNCTION
+        cmd = _LCD_FUNCTION
         if num_lines > 1:
-            cmd |= self.LCD_FUNCTION_2LINES
+            cmd |= _LCD_FUNCTION_2LINES
         self.hal_write_command(cmd)
         gc.collect()
 
+    def _write_byte(self, byte):
+        # Writes a single byte to the PCF8574 through the shared buffer.
+        buf = self._buf
+        buf[0] = byte
+        self.i2c.writeto(self.i2c_addr, buf)
+
     def hal_write_init_nibble(self, nibble):
         # Writes an initialization nibble to the LCD.
         # This particular function is only used during initialization.
-        byte = ((nibble >> 4) & 0x0f) << SHIFT_DATA
-        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytes([byte]))
-        gc.collect()
+        byte = ((nibble >> 4) & 0x0f) << _SHIFT_DATA
+        self._write_byte(byte | _MASK_E)
+        self._write_byte(byte)
         
     def hal_backlight_on(self):
         # Allows the hal layer to turn the backlight on
-        self.i2c.writeto(self.i2c_addr, bytes([1 << SHIFT_BACKLIGHT]))
-        gc.collect()
+        self._write_byte(1 << _SHIFT_BACKLIGHT)
         
     def hal_backlight_off(self):
         #Allows the hal layer to turn the backlight off
-        self.i2c.writeto(self.i2c_addr, bytes([0]))
-        gc.collect()
+        self._write_byte(0)
         
     def hal_write_command(self, cmd):
         # Write a command to the LCD. Data is latched on the falling edge of E.
-        byte = ((self.backlight << SHIFT_BACKLIGHT) |
-                (((cmd >> 4) & 0x0f) << SHIFT_DATA))
-        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytes([byte]))
-        byte = ((self.backlight << SHIFT_BACKLIGHT) |
-                ((cmd & 0x0f) << SHIFT_DATA))
-        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytes([byte]))
+        byte = ((self.backlight << _SHIFT_BACKLIGHT) |
+                (((cmd >> 4) & 0x0f) << _SHIFT_DATA))
+        self._write_byte(byte | _MASK_E)
+        self._write_byte(byte)
+        byte = ((self.backlight << _SHIFT_BACKLIGHT) |
+                ((cmd & 0x0f) << _SHIFT_DATA))
+        self._write_byte(byte | _MASK_E)
+        self._write_byte(byte)
         if cmd <= 3:
             # The home and clear commands require a worst case delay of 4.1 msec
             utime.sleep_ms(5)
-        gc.collect()
 
     def hal_write_data(self, data):
         # Write data to the LCD. Data is latched on the falling edge of E.
-        byte = (MASK_RS |
-                (self.backlight << SHIFT_BACKLIGHT) |
-                (((data >> 4) & 0x0f) << SHIFT_DATA))
-        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytes([byte]))
-        byte = (MASK_RS |
-                (self.backlight << SHIFT_BACKLIGHT) |
-                ((data & 0x0f) << SHIFT_DATA))      
-        self.i2c.writeto(self.i2c_addr, bytes([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytes([byte]))
-        gc.collect()
+        byte = (_MASK_RS |
+                (self.backlight << _SHIFT_BACKLIGHT) |
+                (((data >> 4) & 0x0f) << _SHIFT_DATA))
+        self._write_byte(byte | _MASK_E)
+        self._write_byte(byte)
+        byte = (_MASK_RS |
+                (self.backlight << _SHIFT_BACKLIGHT) |
+                ((data & 0x0f) << _SHIFT_DATA))      
+        self._write_byte(byte | _MASK_E)
+        self._write_byte(byte)
+
+    def hal_write_bytes(self, data):
+        # Write a run of data bytes to the LCD in a single I2C transaction.
+        # Each byte is four PCF8574 writes (high/low nibble, E high/low),
+        # at 400kHz that is slower than the 37us HD44780 write cycle.
+        backlight = (self.backlight << _SHIFT_BACKLIGHT) | _MASK_RS
+        buf = bytearray(len(data) * 4)
+        i = 0
+        for data_byte in data:
+            byte = backlight | (((data_byte >> 4) & 0x0f) << _SHIFT_DATA)
+            buf[i] = byte | _MASK_E
+            buf[i + 1] = byte
+            byte = backlight | ((data_byte & 0x0f) << _SHIFT_DATA)
+            buf[i + 2] = byte | _MASK_E
+            buf[i + 3] = byte
+            i += 4
+        self.i2c.writeto(self.i2c_addr, buf)
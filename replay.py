@@ -0,0 +1,171 @@
+"""Replay a trace recorded on the device through main.py logic on the host.
+
+Usage:
+    python replay.py trace.bin [--storage storage.csv] [--session N]
+
+Hardware is replaced with modules from sim/, the clock and button presses
+come from the trace. Display frames and storage writes are compared with
+the recorded ones, simulated device busy time (sleeps + I2C transfers)
+is reported per loop iteration.
+
+TraceRecorder.dump() appends, so one file can hold sessions from several
+boots. The file is split on boot records and one session is replayed,
+the last one by default. Replay always starts from a fresh boot; if the
+ring buffer wrapped before the dump, outputs may diverge.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, "sim"))
+
+import utime  # noqa: E402  sim/utime.py
+
+from looptrace import (EV_BOOT, EV_BUTTONS, EV_DELETE, EV_FRAME, EV_TICK,  # noqa: E402
+                       EV_WRITE, TICKED, TraceRecorder, load)
+
+OUTPUTS = (EV_FRAME, EV_WRITE, EV_DELETE)
+NAMES = {EV_FRAME: "frame", EV_WRITE: "write", EV_DELETE: "delete"}
+
+
+def sessions(records:list) -> list:
+    """Split trace records on boot records.
+
+    Args:
+        records (list): Records from looptrace.load().
+
+    Returns:
+        list: Lists of records, one per boot.
+    """
+    split = []
+    for record in records:
+        if record[0] == EV_BOOT or not split:
+            split.append([])
+        split[-1].append(record)
+    return split
+
+
+def replay(path:str, storage:str=None, session:int=-1) -> dict:
+    """Feed one session of trace through main.loop().
+
+    Args:
+        path (str): Trace file dumped from device.
+        storage (str, optional): Copy of device storage.csv at the start of trace. Defaults to None, empty storage.
+        session (int, optional): Session to replay, see sessions(). Defaults to -1, last one.
+
+    Returns:
+        (dict): Replay report.
+    """
+    split = sessions(list(load(path)))
+    if not split:
+        raise ValueError(f"{path}: empty trace")
+    try:
+        records = split[session]
+    except IndexError:
+        raise ValueError(f"{path}: session {session} out of {len(split)}") from None
+    start = [value for kind, _, value in records if kind in (EV_BOOT, EV_TICK)]
+    if not start:
+        raise ValueError(f"{path}: no boot or tick records in session {session}")
+    utime.set_time(start[0])
+
+    import main
+
+    tmp = tempfile.mkdtemp()
+    main.STORAGE.path = os.path.join(tmp, "storage.csv")
+    main.HISTORY.path = os.path.join(tmp, "history.idx")
+    if storage is None:
+        main.STORAGE.clear()
+    else:
+        shutil.copyfile(storage, main.STORAGE.path)
+    main.setup()
+
+    recorder = TraceRecorder(len(records) + 1)
+    main.TRACE = main.SCREEN.trace = main.STORAGE.trace = recorder
+
+    busy = []
+
+    def step():
+        before = utime.ticks_us()
+        main.loop()
+        busy.append(utime.ticks_diff(utime.ticks_us(), before))
+
+    # a tick runs its loop iteration lazily, so buttons read in the same
+    # iteration (TICKED) are pressed before it runs
+    ticked = False
+    for kind, _, value in records:
+        if kind == EV_TICK:
+            if ticked:
+                step()
+            utime.set_time(value)
+            ticked = True
+        elif kind == EV_BUTTONS:
+            if ticked and not value & TICKED:
+                step()
+            for i in range(len(main.BTN)):
+                if value & (1 << i):
+                    main.BTN[i].btn.press()
+            step()
+            ticked = False
+    if ticked:
+        step()
+    shutil.rmtree(tmp)
+
+    expected = [(kind, value) for kind, _, value in records if kind in OUTPUTS]
+    actual = [(kind, value) for kind, _, value in recorder.records() if kind in OUTPUTS]
+    diverged = None
+    for i, (exp, act) in enumerate(zip(expected, actual)):
+        if exp != act:
+            diverged = i
+            break
+    if diverged is None and len(expected) != len(actual):
+        diverged = min(len(expected), len(actual))
+
+    return {
+        "sessions": len(split),
+        "records": len(records),
+        "iterations": len(busy),
+        "busy_total_us": sum(busy),
+        "busy_max_us": max(busy) if busy else 0,
+        "i2c_bytes": main.SCREEN.lcd.i2c.bytes_written,
+        "expected": expected,
+        "actual": actual,
+        "diverged": diverged,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trace", help="trace file dumped from device")
+    parser.add_argument("--storage", help="device storage.csv at the start of trace")
+    parser.add_argument("--session", type=int, default=-1, help="session (boot) to replay, default last")
+    args = parser.parse_args()
+
+    try:
+        report = replay(args.trace, args.storage, args.session)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+    print(f"sessions:   {report['sessions']}, replaying {args.session}")
+    print(f"records:    {report['records']}")
+    print(f"iterations: {report['iterations']}")
+    print(f"busy total: {report['busy_total_us']}us")
+    print(f"busy max:   {report['busy_max_us']}us")
+    print(f"i2c bytes:  {report['i2c_bytes']}")
+    if report["diverged"] is None:
+        print(f"outputs:    {len(report['actual'])} match")
+        return 0
+    i = report["diverged"]
+    exp = report["expected"][i] if i < len(report["expected"]) else None
+    act = report["actual"][i] if i < len(report["actual"]) else None
+    print(f"outputs:    diverged at #{i}, "
+          f"expected {exp and NAMES[exp[0]]} {exp and exp[1]}, got {act and NAMES[act[0]]} {act and act[1]}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+"""Host stand-in for MicroPython machine, enough for classes.py."""
+
+import utime
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    PULL_DOWN = 2
+
+    def __init__(self, gpio, mode=-1, pull=-1):
+        self.gpio = gpio
+        self._values = []
+
+    def press(self):
+        """
+        Queue values read by Button.active() for one press and release.
+        """
+        self._values = [1, 1, 0]
+
+    def value(self):
+        if self._values:
+            return self._values.pop(0)
+        return 0
+
+
+class I2C:
+    def __init__(self, bus, sda=None, scl=None, freq=400000):
+        self.freq = freq
+        self.bytes_written = 0
+
+    def scan(self):
+        return [0x27]
+
+    def writeto(self, addr, buf):
+        # address byte + data, 9 clocks per byte with ACK
+        self.bytes_written += len(buf)
+        utime.add_busy((len(buf) + 1) * 9 * 1000000 // self.freq)
@@ -0,0 +1,5 @@
+"""Host stand-in for MicroPython micropython module."""
+
+
+def const(value):
+    return value
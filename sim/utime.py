@@ -0,0 +1,55 @@
+"""Host stand-in for MicroPython utime, driven by the replay clock.
+
+time() only moves when the replay sets it. Sleeps and I2C transfers add
+to the simulated busy time, which ticks_ms()/ticks_us() include.
+"""
+
+import time as _time
+
+# ticks_xxx() wrap around like on the device
+TICKS_PERIOD = 1 << 30
+
+_now = 0
+busy_us = 0
+
+
+def set_time(seconds):
+    global _now
+    _now = seconds
+
+
+def add_busy(usecs):
+    global busy_us
+    busy_us += usecs
+
+
+def time():
+    return _now
+
+
+def localtime(seconds=None):
+    return tuple(_time.gmtime(_now if seconds is None else seconds))[:8]
+
+
+def sleep(seconds):
+    add_busy(int(seconds * 1000000))
+
+
+def sleep_ms(msecs):
+    add_busy(msecs * 1000)
+
+
+def sleep_us(usecs):
+    add_busy(usecs)
+
+
+def ticks_us():
+    return (_now * 1000000 + busy_us) % TICKS_PERIOD
+
+
+def ticks_ms():
+    return (_now * 1000 + busy_us // 1000) % TICKS_PERIOD
+
+
+def ticks_diff(new, old):
+    return ((new - old + TICKS_PERIOD // 2) % TICKS_PERIOD) - TICKS_PERIOD // 2